@@ -1,28 +1,87 @@
 # app.py
 import asyncio
+import logging
+import sys
+import threading
 import time
+
+# libuv-based event loop: drop-in replacement that is markedly faster on
+# exactly this workload (many WS coroutines, frequent sends and lock
+# acquires). Linux-only; stock asyncio remains the fallback elsewhere.
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+from collections import OrderedDict, deque
 from typing import Dict
 
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, File, Depends, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Query, File, Depends, Request, UploadFile, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 
 from services.engagement_service import save_engagement_metrics
 
+# orjson serializes straight to UTF-8 bytes, several times faster than
+# stdlib json on the small dicts the WS hot path sends; fall back to
+# Starlette's send_json when it isn't installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # from services.db_stub import db_writer_stub  # swap with real writer in production
 # =======
 from services.db_sqlalchemy import (
-    save_engagement_sqlalchemy as db_writer_stub,
+    get_meeting_summary_stats,
+    save_engagement_frames_bulk,
     save_transcript_sqlalchemy
 )
 
 
 app = FastAPI(title="EngageTrack API (per-participant WS)")
 
+# CORS for browser clients posting frames/audio cross-origin. max_age lets
+# browsers cache the preflight response for a day, so each origin pays one
+# OPTIONS round-trip per day instead of one per request burst.
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type"],
+    max_age=86400,
+)
+
 # Map participant_id -> VideoProcessor instance (lazy-created)
 video_processors: Dict[str, object] = {}
-# Map participant_id -> last active timestamp (epoch seconds)
-last_active: Dict[str, float] = {}
-# Lock to protect shared maps
+# Map participant_id -> last active tick (monotonic seconds), kept in
+# least-recently-active order so eviction only inspects the head instead
+# of scanning every participant each cleanup tick
+last_active: "OrderedDict[str, float]" = OrderedDict()
+
+# Participants with an open WebSocket. Idle eviction skips these: a
+# muted/paused participant sends no frames for minutes, but their
+# handler still holds its processor reference — retiring it under the
+# handler would hand the same object (and its state) to another
+# connection via the pool.
+live_ws_pids: set = set()
+
+# Coarse activity clock: refreshed once per second by the cleanup loop so
+# per-frame activity updates don't each pay a clock syscall. Monotonic,
+# so idle-timeout math is immune to wall-clock adjustments. One-second
+# granularity is plenty against a 60 s idle timeout.
+current_tick = time.monotonic()
+
+
+def _touch_participant(pid: str):
+    """Record activity for pid and move it to the most-recent end."""
+    last_active[pid] = current_tick
+    last_active.move_to_end(pid)
+
+
+# Lock protecting *mutation* (insert/delete) of the shared maps only.
+# Plain reads (video_processors.get) are atomic under the GIL and run
+# lock-free, so concurrent participants don't serialize on lookups.
 processors_lock = asyncio.Lock()
 
 # Idle timeout (seconds) after which a participant processor will be evicted
@@ -31,27 +90,248 @@ PROCESSOR_IDLE_TIMEOUT = 60  # adjust as needed
 # Background cleanup task handle
 cleanup_task = None
 
-# Lazy audio processor handle (don't instantiate at startup)
+class SingleConsumerQueue:
+    """
+    Minimal deque + Future queue for single-consumer pipelines.
+
+    asyncio.Queue pays for multi-consumer bookkeeping (waiter deques,
+    locks) we don't need: each of our queues is drained by exactly one
+    task. A plain deque with one wake-up Future is 2-3x cheaper per item.
+    With a maxsize, the underlying deque drops the oldest item on
+    overflow ("latest value wins").
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self._items = deque(maxlen=maxsize or None)
+        self._waiter = None
+
+    def put_nowait(self, item):
+        self._items.append(item)
+        w = self._waiter
+        if w is not None and not w.done():
+            w.set_result(None)
+
+    def get_nowait(self):
+        # Raises IndexError when empty, like deque.popleft()
+        return self._items.popleft()
+
+    async def get(self):
+        while not self._items:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._items.popleft()
+
+    def __len__(self):
+        return len(self._items)
+
+
+# Logger for the DB writer path. When the database goes away every
+# queued batch fails the same way at flush rate; the dedupe filter keeps
+# one record per message per second so a DB outage doesn't turn into a
+# stdio-lock storm across the writer and drain coroutines.
+logger = logging.getLogger(__name__)
+
+
+class _DedupeFilter(logging.Filter):
+    _WINDOW_SEC = 1.0
+
+    def __init__(self):
+        super().__init__()
+        self._last_seen = {}
+
+    def filter(self, record):
+        now = time.monotonic()
+        last = self._last_seen.get(record.msg, 0.0)
+        if now - last < self._WINDOW_SEC:
+            return False
+        self._last_seen[record.msg] = now
+        return True
+
+
+logger.addFilter(_DedupeFilter())
+
+# Queue of per-frame metric payloads awaiting the single DB writer task.
+# The WS handlers only enqueue; one long-lived consumer owns all DB work,
+# so DB latency never feeds back into frame latency.
+DB_QUEUE_MAXSIZE = 10000
+DB_BATCH_MAX_ROWS = 500  # max payloads drained per bulk insert
+db_queue = SingleConsumerQueue(maxsize=DB_QUEUE_MAXSIZE)
+
+# Background DB writer task handle
+db_writer_task = None
+
+# Cap on unsent results buffered per WS connection. A slow client can't
+# grow the send queue unbounded: past this, the oldest unsent result is
+# dropped (instant metrics — latest value wins).
+WS_SEND_QUEUE_MAXSIZE = 32
+
+# Deadline on a single process_frame_bytes call. An executor future
+# cannot be cancelled once its thread has started, so a timeout means
+# the processor is abandoned immediately: a fresh one takes over the
+# connection and the old one is recycled only after its in-flight call
+# unwinds (see _abandon_processor).
+FRAME_PROCESS_TIMEOUT = 0.5
+
+# Process-wide audio processor. Created once (the underlying WhisperModel
+# is cached in detection.audio_processor) and shared by every
+# /analyze_audio request; warmed in the background at startup so the
+# first real request doesn't pay the model load.
 audio_proc = None
+_audio_proc_lock = threading.Lock()
+
+
+def _get_audio_processor():
+    global audio_proc
+    if audio_proc is None:
+        from detection.audio_processor import AudioProcessor  # lazy import
+        with _audio_proc_lock:
+            if audio_proc is None:
+                audio_proc = AudioProcessor(model_name="models/tiny", device="cpu")
+    return audio_proc
+
+
+async def _warm_audio_processor():
+    try:
+        proc = await asyncio.to_thread(_get_audio_processor)
+        # Touching the model loads the weights; 0.1 s of silence keeps it cheap
+        import numpy as np
+        silence = np.zeros(1600, dtype=np.float32)
+        await asyncio.to_thread(proc._transcribe_audio, silence)
+        print("Audio processor warmed.")
+    except Exception as e:
+        print("Audio warmup skipped:", e)
+
+# Process pool for the one-shot HTTP frame endpoints. Each worker holds a
+# warm VideoProcessor (see detection.frame_workers), so single-frame
+# requests get real multi-core parallelism instead of contending for the
+# server process's GIL. The WS path keeps in-process per-participant
+# processors because their EngagementLogic state lives with the connection.
+# Created lazily so startup stays light.
+frame_executor = None
+
+
+def _get_frame_executor():
+    global frame_executor
+    if frame_executor is None:
+        import os
+        from concurrent.futures import ProcessPoolExecutor
+        from detection import frame_workers
+        frame_executor = ProcessPoolExecutor(
+            max_workers=max(1, (os.cpu_count() or 2) // 2),
+            initializer=frame_workers.init_worker,
+        )
+    return frame_executor
+
+
+# Bounded thread pool for WS frame processing. The WS path can't move to
+# the process pool (per-participant EngagementLogic state lives in this
+# process), but asyncio.to_thread shares the default min(32, cpus+4)
+# executor with every other offload in the app — under load, 32 threads
+# all running MediaPipe oversubscribe the cores and thrash. Capping at
+# cpu_count keeps one frame in flight per core and queues the rest.
+ws_frame_executor = None
+
+
+def _get_ws_frame_executor():
+    global ws_frame_executor
+    if ws_frame_executor is None:
+        import os
+        from concurrent.futures import ThreadPoolExecutor
+        ws_frame_executor = ThreadPoolExecutor(
+            max_workers=max(2, os.cpu_count() or 2),
+            thread_name_prefix="ws-frame",
+        )
+    return ws_frame_executor
+
+
+# Pool of idle VideoProcessors. Building one loads MediaPipe graphs
+# (tens to hundreds of ms of native init); instead of destroying a
+# processor on disconnect/eviction and rebuilding it on the next
+# connect, retired processors are reset (cheap pure-Python state only)
+# and reused LIFO. Append/pop on a deque are GIL-atomic.
+VP_POOL_MAXSIZE = 8
+vp_pool: deque = deque()
+
+
+async def _retire_processor(proc):
+    """Return a processor to the pool, or close it if the pool is full."""
+    if proc is None:
+        return
+    if len(vp_pool) < VP_POOL_MAXSIZE:
+        try:
+            proc.reset()
+            vp_pool.append(proc)
+            return
+        except Exception:
+            pass
+    await _close_processor(proc)
+
+
+async def _abandon_processor(proc, inflight):
+    """
+    Dispose of a processor whose frame call outlived its deadline. The
+    executor thread is still inside native code and can't be cancelled,
+    so wait for the in-flight future to resolve before touching the
+    processor: a call that eventually returned (e.g. a slow first frame
+    under load) leaves the graphs healthy and the processor goes back to
+    the pool; one that raised gets closed.
+    """
+    try:
+        await inflight
+    except Exception:
+        try:
+            await _close_processor(proc)
+        except Exception:
+            pass
+        return
+    try:
+        await _retire_processor(proc)
+    except Exception:
+        pass
 
 
 @app.on_event("startup")
 async def start_cleanup_task():
-    global cleanup_task
+    global cleanup_task, db_writer_task
     cleanup_task = asyncio.create_task(_cleanup_inactive_processors_loop())
+    db_writer_task = asyncio.create_task(_db_writer_consumer())
+    # Fire-and-forget: warm the Whisper model without delaying startup
+    asyncio.create_task(_warm_audio_processor())
     app.logger = app.logger if hasattr(app, "logger") else None
     print("Cleanup task started.")
 
 
 @app.on_event("shutdown")
 async def shutdown_cleanup_task():
-    global cleanup_task
+    global cleanup_task, db_writer_task
     if cleanup_task:
         cleanup_task.cancel()
         try:
             await cleanup_task
         except asyncio.CancelledError:
             pass
+    if db_writer_task:
+        db_writer_task.cancel()
+        try:
+            await db_writer_task
+        except asyncio.CancelledError:
+            pass
+    # Drain anything still queued before the process exits; each pass
+    # persists at most DB_BATCH_MAX_ROWS, so loop until the queue is empty
+    try:
+        while len(db_queue):
+            await _drain_db_queue_once()
+    except Exception:
+        logger.exception("Final DB drain failed")
+
+    # Shut down the frame worker pools (workers close their processors on exit)
+    if frame_executor is not None:
+        frame_executor.shutdown(wait=False, cancel_futures=True)
+    if ws_frame_executor is not None:
+        ws_frame_executor.shutdown(wait=False, cancel_futures=True)
 
     # Close all remaining processors
     async with processors_lock:
@@ -62,31 +342,93 @@ async def shutdown_cleanup_task():
                 pass
             video_processors.pop(pid, None)
             last_active.pop(pid, None)
+    # Pooled idle processors hold native resources too
+    while vp_pool:
+        try:
+            await _close_processor(vp_pool.pop())
+        except Exception:
+            pass
     print("Shutdown complete: processors closed.")
 
 
 async def _cleanup_inactive_processors_loop():
     """
-    Periodically evict idle participants to free resources.
+    Refreshes the coarse activity clock every second and evicts idle
+    participants every 10 ticks.
     """
+    global current_tick
+    ticks = 0
     try:
         while True:
-            now = time.time()
-            evict = []
-            async with processors_lock:
-                for pid, ts in list(last_active.items()):
-                    if now - ts > PROCESSOR_IDLE_TIMEOUT:
-                        evict.append(pid)
-                for pid in evict:
-                    proc = video_processors.pop(pid, None)
-                    last_active.pop(pid, None)
-                    if proc:
-                        try:
-                            await _close_processor(proc)
-                        except Exception:
-                            pass
-                        print(f"Evicted processor for participant {pid} due to inactivity.")
-            await asyncio.sleep(10)
+            current_tick = time.monotonic()
+            ticks += 1
+            if ticks % 10 == 0:
+                now = current_tick
+                async with processors_lock:
+                    # Oldest entry is at the head, so this is O(evicted), not O(N)
+                    while last_active and now - next(iter(last_active.values())) > PROCESSOR_IDLE_TIMEOUT:
+                        pid, _ = last_active.popitem(last=False)
+                        if pid in live_ws_pids:
+                            # Connection still open — the handler holds
+                            # this processor, so count the open socket
+                            # as activity instead of evicting it
+                            last_active[pid] = now
+                            continue
+                        proc = video_processors.pop(pid, None)
+                        if proc:
+                            try:
+                                await _retire_processor(proc)
+                            except Exception:
+                                pass
+                            print(f"Evicted processor for participant {pid} due to inactivity.")
+            await asyncio.sleep(1)
+    except asyncio.CancelledError:
+        return
+
+
+def _enqueue_metrics(payload):
+    """
+    Hand a processed-frame payload to the DB writer task. The WS loop never
+    blocks on the DB: on overflow the queue drops its oldest payload
+    (metrics are instantaneous values, losing the stalest one is fine).
+    """
+    db_queue.put_nowait(payload)
+
+
+async def _drain_db_queue_once():
+    """
+    Drain whatever is currently queued (up to DB_BATCH_MAX_ROWS) and persist
+    it with one bulk insert run in a thread.
+    """
+    frames = []
+    while len(frames) < DB_BATCH_MAX_ROWS:
+        try:
+            frames.append(db_queue.get_nowait())
+        except IndexError:
+            break
+    if frames:
+        await asyncio.to_thread(save_engagement_frames_bulk, frames)
+
+
+async def _db_writer_consumer():
+    """
+    Single long-lived consumer that owns all engagement-metric persistence.
+    Blocks for the first payload, then drains the queue into one batched
+    insert, so the per-frame cost on the WS path is just a put_nowait.
+    """
+    try:
+        while True:
+            first = await db_queue.get()
+            frames = [first]
+            while len(frames) < DB_BATCH_MAX_ROWS:
+                try:
+                    frames.append(db_queue.get_nowait())
+                except IndexError:
+                    break
+            try:
+                await asyncio.to_thread(save_engagement_frames_bulk, frames)
+            except Exception:
+                logger.exception("DB writer error")
     except asyncio.CancelledError:
         return
 
@@ -117,19 +459,48 @@ async def analyze_frame(file: UploadFile = File(...)):
     Lazy-imports VideoProcessor to avoid loading heavy libs on startup.
     """
     contents = await file.read()
-    # lazy import & create one-off processor
-    from detection.video_processor import VideoProcessor  # local import (lazy)
-    proc = None
-    try:
-        proc = VideoProcessor()
-        result = await asyncio.to_thread(proc.process_frame_bytes, contents)
-    finally:
-        # ensure release of resources
-        if proc:
-            try:
-                await _close_processor(proc)
-            except Exception:
-                pass
+    return await _analyze_frame_bytes(contents)
+
+
+@app.post("/analyze_frame_bin")
+async def analyze_frame_bin(request: Request):
+    """
+    Binary sibling of /analyze_frame: POST raw JPEG/PNG bytes as
+    application/octet-stream. No multipart parsing and no base64
+    round-trip — the body *is* the frame.
+    """
+    contents = await request.body()
+    if not contents:
+        raise HTTPException(status_code=400, detail="empty request body")
+    return await _analyze_frame_bytes(contents)
+
+
+@app.get("/meeting_summary_pdf")
+async def get_meeting_summary_pdf(meeting_id: str = Query(...)):
+    """
+    Render a PDF summary for a meeting. Engagement counts are aggregated
+    DB-side in one query (count + sum(case(...))), so no stored rows are
+    iterated in Python regardless of meeting length. The PDF is built and
+    served entirely in memory — no /tmp write + read-back.
+    """
+    from utils.file_utils import generate_pdf_meeting_summary  # lazy import (fpdf)
+    stats, transcripts = await asyncio.to_thread(get_meeting_summary_stats, meeting_id)
+    pdf_bytes = await asyncio.to_thread(
+        generate_pdf_meeting_summary, meeting_id, stats, transcripts
+    )
+    return Response(
+        content=pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="{meeting_id}_summary.pdf"'},
+    )
+
+
+async def _analyze_frame_bytes(contents: bytes):
+    from detection import frame_workers
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        _get_frame_executor(), frame_workers.process_frame, contents
+    )
     return JSONResponse(result)
 
 
@@ -238,23 +609,19 @@ async def analyze_audio(
 ):
     print("=== analyze_audio request started ===")
 
-    contents = await file.read()
-    print(f"Read {len(contents)} bytes from uploaded file")
-
     print("Running transcription...")
     try:
-        # Create a new instance per request (no global)
-        from detection.audio_processor import AudioProcessor  # lazy import
-        audio_proc = AudioProcessor(model_name="models/tiny", device="cpu")
+        # Shared processor — the model behind it is loaded once per process
+        proc = _get_audio_processor()
 
-        # Run transcription in a thread to avoid blocking
-        result = await asyncio.to_thread(audio_proc.transcribe_bytes, contents)
+        # Stream the upload straight to the processor in a thread — no
+        # full-payload bytes object in memory, and no event-loop blocking
+        result = await asyncio.to_thread(proc.transcribe_stream, file.file)
         print("Transcription finished")
 
-        transcript_text = " ".join(
-            seg[1] if isinstance(seg, tuple) else str(seg)
-            for seg in result
-        )
+        # Single pass over the (timestamp, text) tuples straight into join —
+        # no intermediate list and no per-segment type checks
+        transcript_text = " ".join(text for _, text in result)
 
         # Save transcript to DB
         save_transcript_sqlalchemy(
@@ -271,12 +638,37 @@ async def analyze_audio(
 
 
 
-def get_db_writer():
+async def _ws_send_loop(websocket: WebSocket, participant_id: str, out_q: SingleConsumerQueue):
     """
-    Dependency to provide the DB writer function.
-    Replace with actual DB writer in production.
+    Outbound writer for one connection. Blocks for the first result, then
+    drains everything already queued and emits the burst as a single JSON
+    frame, so a lagging client gets one batched frame instead of a pile-up
+    of per-result frames saturating the TCP send buffer.
     """
-    return db_writer_stub
+    # One outer envelope per connection, mutated in place per burst —
+    # the serializer reads it synchronously, so reuse is safe
+    message = {"participant_id": participant_id, "batch": None}
+    while True:
+        first = await out_q.get()
+        batch = [first]
+        while True:
+            try:
+                batch.append(out_q.get_nowait())
+            except IndexError:
+                break
+        message["batch"] = batch
+        try:
+            if orjson is not None:
+                # binary frame carrying UTF-8 JSON; clients parse it the same way
+                await websocket.send_bytes(orjson.dumps(message))
+            else:
+                await websocket.send_json(message)
+        except Exception:
+            # Client closed mid-burst — routine, not exceptional. The
+            # handler sees the disconnect on its own receive and runs
+            # cleanup; finish quietly so the done task doesn't sit on an
+            # unretrieved exception. (CancelledError still propagates.)
+            return
 
 
 @app.websocket("/ws/frames")
@@ -284,27 +676,46 @@ async def websocket_frames(
     websocket: WebSocket,
     meeting_id: str = Query(...),
     participant_id: str = Query(...),
-    db_writer=Depends(get_db_writer),
 ):
     """
     WebSocket endpoint for per-participant real-time frame analysis.
 
     Connect as:
       wss://host/ws/frames?meeting_id=room123&participant_id=user456
+
+    Responses arrive as {"participant_id": ..., "batch": [result, ...]} —
+    one frame per burst of results.
     """
+    # Intern the id once so the per-frame dict lookups/updates keyed on it
+    # reuse the cached string hash instead of re-hashing the query value
+    participant_id = sys.intern(participant_id)
     await websocket.accept()
+    live_ws_pids.add(participant_id)
     proc = None
+    out_q = SingleConsumerQueue(maxsize=WS_SEND_QUEUE_MAXSIZE)
+    sender_task = asyncio.create_task(_ws_send_loop(websocket, participant_id, out_q))
 
     try:
-        # create or fetch participant processor (lazy)
-        async with processors_lock:
-            proc = video_processors.get(participant_id)
-            if proc is None:
-                # lazy import VideoProcessor only when needed
-                from detection.video_processor import VideoProcessor  # lazy import
-                proc = VideoProcessor()
-                video_processors[participant_id] = proc
-            last_active[participant_id] = time.time()
+        # create or fetch participant processor (lazy); the read is
+        # lock-free, the lock is only taken to insert a new entry
+        proc = video_processors.get(participant_id)
+        if proc is None:
+            async with processors_lock:
+                proc = video_processors.get(participant_id)
+                if proc is None:
+                    try:
+                        proc = vp_pool.pop()  # warm graphs, state already reset
+                    except IndexError:
+                        # lazy import VideoProcessor only when needed
+                        from detection.video_processor import VideoProcessor  # lazy import
+                        proc = VideoProcessor()
+                        # Per-processor lock: MediaPipe graphs aren't
+                        # re-entrant, so two sockets claiming the same
+                        # participant_id must not process concurrently.
+                        # Distinct participants never contend on it.
+                        proc._lock = asyncio.Lock()
+                    video_processors[participant_id] = proc
+        _touch_participant(participant_id)
 
         while True:
             # Receive binary frame bytes (blocks until a message)
@@ -314,76 +725,90 @@ async def websocket_frames(
                 # non-bytes or connection error
                 raise
 
-            # update last active timestamp
-            async with processors_lock:
-                last_active[participant_id] = time.time()
+            # update last active timestamp; dict assignment/move_to_end on
+            # an existing key is atomic under the GIL, so no lock is needed
+            # on this per-frame path
+            _touch_participant(participant_id)
 
-            # Offload CPU-bound processing to thread
+            # Offload CPU-bound processing to thread, serialized per
+            # processor only — the global map lock is never held here.
+            # The deadline keeps one stuck native call from pinning this
+            # connection forever. The future is shielded so a timeout
+            # leaves it running instead of abandoning it half-awaited.
             try:
-                result = await asyncio.to_thread(proc.process_frame_bytes, frame_bytes)
+                async with proc._lock:
+                    inflight = asyncio.get_running_loop().run_in_executor(
+                        _get_ws_frame_executor(), proc.process_frame_bytes, frame_bytes
+                    )
+                    async with asyncio.timeout(FRAME_PROCESS_TIMEOUT):
+                        result = await asyncio.shield(inflight)
+            except TimeoutError:
+                # The executor thread is still inside process_frame_bytes
+                # and MediaPipe graphs aren't re-entrant, so this
+                # processor must not see another frame until that call
+                # returns. Swap in a fresh processor right away and let
+                # _abandon_processor recycle the old one once its
+                # in-flight call resolves.
+                stuck = proc
+                try:
+                    proc = vp_pool.pop()
+                except IndexError:
+                    from detection.video_processor import VideoProcessor  # lazy import
+                    proc = VideoProcessor()
+                    proc._lock = asyncio.Lock()
+                async with processors_lock:
+                    video_processors[participant_id] = proc
+                asyncio.create_task(_abandon_processor(stuck, inflight))
+                out_q.put_nowait({"error": "processing timeout"})
+                print(f"Replaced timed-out processor for participant {participant_id}.")
+                continue
             except Exception as e:
                 # respond with error but keep connection open
-                await websocket.send_json({"error": str(e)})
+                out_q.put_nowait({"error": str(e)})
                 continue
 
-            # Persist metrics via provided db_writer (db_writer can be sync or async)
-            try:
-                # Allow db_writer to be async or sync callable
-                if asyncio.iscoroutinefunction(db_writer):
-                    await db_writer({
-                        "meeting_id": meeting_id,
-                        "participant_id": participant_id,
-                        "timestamp": time.time(),
-                        "attention_instant": result.get("attention_instant"),
-                        "fatigue_instant": result.get("fatigue_instant"),
-                        "hand_instant": result.get("hand_instant"),
-                        "events_logged": result.get("events_logged"),
-                    })
-                else:
-                    # run sync writer in thread to avoid blocking
-                    await asyncio.to_thread(db_writer, {
-                        "meeting_id": meeting_id,
-                        "participant_id": participant_id,
-                        "timestamp": time.time(),
-                        "attention_instant": result.get("attention_instant"),
-                        "fatigue_instant": result.get("fatigue_instant"),
-                        "hand_instant": result.get("hand_instant"),
-                        "events_logged": result.get("events_logged"),
-                    })
-            except Exception as e:
-                # log writer error and continue; don't crash the WS
-                try:
-                    await websocket.send_json({"db_error": str(e)})
-                except Exception:
-                    pass
-
-            # Send analysis result back to the client
-            result_with_meta = {"participant_id": participant_id, "analysis": result}
-            await websocket.send_json(result_with_meta)
+            # Hand metrics to the single DB writer task; the WS loop only
+            # enqueues and immediately proceeds to send the result back
+            _enqueue_metrics({
+                "meeting_id": meeting_id,
+                "participant_id": participant_id,
+                "timestamp": time.time(),
+                "attention_instant": result.get("attention_instant"),
+                "fatigue_instant": result.get("fatigue_instant"),
+                "hand_instant": result.get("hand_instant"),
+                "events_logged": result.get("events_logged"),
+            })
+
+            # Queue the analysis result for the batching sender
+            out_q.put_nowait({"analysis": result})
 
     except WebSocketDisconnect:
         # client disconnected; free resources promptly
+        sender_task.cancel()
         async with processors_lock:
             proc = video_processors.pop(participant_id, None)
             last_active.pop(participant_id, None)
         if proc:
             try:
-                await _close_processor(proc)
+                await _retire_processor(proc)
             except Exception:
                 pass
         print(f"WS disconnected: {participant_id}")
     except Exception as e:
         # unexpected error: try to close proc and websocket
         print("WS error for participant", participant_id, ":", e)
+        sender_task.cancel()
         try:
             async with processors_lock:
                 proc = video_processors.pop(participant_id, None)
                 last_active.pop(participant_id, None)
             if proc:
-                await _close_processor(proc)
+                await _retire_processor(proc)
         except Exception:
             pass
         try:
             await websocket.close()
         except Exception:
-            pass
\ No newline at end of file
+            pass
+    finally:
+        live_ws_pids.discard(participant_id)
\ No newline at end of file
@@ -34,3 +34,8 @@ FATIGUE_YAWN_COOLDOWN_SECONDS = 60
 FATIGUE_BLINK_COUNT = 5
 FATIGUE_BLINK_WINDOW_SECONDS = 10
 FATIGUE_BLINK_COOLDOWN_SECONDS = 10
+
+# Frame-skip gate: mean absolute pixel difference (0-255 scale, on a
+# 16x16 grayscale thumbnail) below which a frame is considered unchanged
+FRAME_SKIP_DIFF_THRESHOLD = 2.0
+FRAME_SKIP_MAX_CONSECUTIVE = 15
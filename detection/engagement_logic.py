@@ -1,18 +1,45 @@
 import time
+from array import array
+from bisect import bisect_left
 from collections import deque
 from config import *  # import thresholds
 
+# Hand-activity window in seconds, derived once at import time instead
+# of re-dividing on every frame
+HAND_WINDOW_SEC = HAND_MOVEMENT_WINDOW_FRAMES / VIDEO_FPS_TARGET
+
 class EngagementLogic:
     def __init__(self, logger_callback):
         self.logger = logger_callback
 
+        # Thresholds bound once per instance; the detect methods run per
+        # frame and instance-attribute reads skip the config module dict
+        self._ear_threshold = EAR_THRESHOLD
+        self._ear_consec_closed = EAR_CONSEC_FRAMES_CLOSED
+        self._mar_threshold = MAR_THRESHOLD
+        self._mar_consec_open = MAR_CONSEC_FRAMES_OPEN
+        self._attention_yaw = ATTENTION_YAW_THRESHOLD
+        self._pitch_focused_min = PITCH_FOCUSED_MIN_ABS_THRESHOLD
+        self._attention_consistency = ATTENTION_CONSISTENCY_SECONDS
+        self._hand_raise_cooldown = HAND_RAISE_COOLDOWN_SECONDS
+        self._hand_move_cooldown = HAND_MOVEMENT_COOLDOWN_SECONDS
+        self._hand_move_std = HAND_MOVEMENT_STD_THRESHOLD
+        self._yawn_count = FATIGUE_YAWN_COUNT
+        self._yawn_window = FATIGUE_YAWN_WINDOW_SECONDS
+        self._yawn_cooldown = FATIGUE_YAWN_COOLDOWN_SECONDS
+        self._blink_count = FATIGUE_BLINK_COUNT
+        self._blink_window = FATIGUE_BLINK_WINDOW_SECONDS
+        self._blink_cooldown = FATIGUE_BLINK_COOLDOWN_SECONDS
+
         # Attention tracking
         self._current_attention_state = "Focused"
         self._distraction_start_time = 0
         self.last_logged_attention_state = "Focused"
 
-        # Hand tracking
-        self.hand_events_deque = deque()
+        # Hand tracking. Hand events arrive every frame during motion
+        # bursts, so timestamps live in a packed sorted array pruned by
+        # binary search; blinks/yawns stay deques (a few events a minute)
+        self.hand_events_times = array('d')
         self.hand_cooldown_end_time = 0
         self.last_hand_raised_log_time = 0
 
@@ -43,11 +70,11 @@ class EngagementLogic:
                 self._current_attention_state = "Focused"
             else:
                 distraction_duration = now - self._distraction_start_time
-                if distraction_duration >= ATTENTION_CONSISTENCY_SECONDS:
+                if distraction_duration >= self._attention_consistency:
                     direction = ""
-                    if abs(current_yaw) > ATTENTION_YAW_THRESHOLD:
+                    if abs(current_yaw) > self._attention_yaw:
                         direction = "sideways"
-                    if abs(current_pitch) < PITCH_FOCUSED_MIN_ABS_THRESHOLD:
+                    if abs(current_pitch) < self._pitch_focused_min:
                         if current_pitch > 0:
                             direction = "down" if not direction else direction + " and down"
                         else:
@@ -66,19 +93,19 @@ class EngagementLogic:
         now = self._now()
         if now < self.blink_cooldown_end_time:
             return
-        if ear < EAR_THRESHOLD:
+        if ear < self._ear_threshold:
             self._frames_eye_closed += 1
-            if not self._is_eye_closed and self._frames_eye_closed >= EAR_CONSEC_FRAMES_CLOSED:
+            if not self._is_eye_closed and self._frames_eye_closed >= self._ear_consec_closed:
                 self._is_eye_closed = True
         else:
             if self._is_eye_closed:
-                if self._frames_eye_closed >= EAR_CONSEC_FRAMES_CLOSED:
+                if self._frames_eye_closed >= self._ear_consec_closed:
                     self.blink_events_deque.append(now)
-                    while self.blink_events_deque and now - self.blink_events_deque[0] > FATIGUE_BLINK_WINDOW_SECONDS:
+                    while self.blink_events_deque and now - self.blink_events_deque[0] > self._blink_window:
                         self.blink_events_deque.popleft()
-                    if len(self.blink_events_deque) >= FATIGUE_BLINK_COUNT:
+                    if len(self.blink_events_deque) >= self._blink_count:
                         self.logger(event_type="Fatigue", description="Blink: tired fatigue", timestamp=now)
-                        self.blink_cooldown_end_time = now + FATIGUE_BLINK_COOLDOWN_SECONDS
+                        self.blink_cooldown_end_time = now + self._blink_cooldown
                 self._is_eye_closed = False
             self._frames_eye_closed = 0
 
@@ -86,34 +113,35 @@ class EngagementLogic:
         now = self._now()
         if now < self.yawn_cooldown_end_time:
             return
-        if mar > MAR_THRESHOLD:
+        if mar > self._mar_threshold:
             self._frames_mouth_open += 1
-            if not self._is_mouth_open and self._frames_mouth_open >= MAR_CONSEC_FRAMES_OPEN:
+            if not self._is_mouth_open and self._frames_mouth_open >= self._mar_consec_open:
                 self._is_mouth_open = True
         else:
             if self._is_mouth_open:
-                if self._frames_mouth_open >= MAR_CONSEC_FRAMES_OPEN:
+                if self._frames_mouth_open >= self._mar_consec_open:
                     self.yawn_events_deque.append(now)
-                    while self.yawn_events_deque and now - self.yawn_events_deque[0] > FATIGUE_YAWN_WINDOW_SECONDS:
+                    while self.yawn_events_deque and now - self.yawn_events_deque[0] > self._yawn_window:
                         self.yawn_events_deque.popleft()
-                    if len(self.yawn_events_deque) >= FATIGUE_YAWN_COUNT:
+                    if len(self.yawn_events_deque) >= self._yawn_count:
                         self.logger(event_type="Fatigue", description="Yawning", timestamp=now)
-                        self.yawn_cooldown_end_time = now + FATIGUE_YAWN_COOLDOWN_SECONDS
+                        self.yawn_cooldown_end_time = now + self._yawn_cooldown
                 self._is_mouth_open = False
             self._frames_mouth_open = 0
 
     def register_hand_event(self, is_hand_raised_now: bool, hand_positions_std: float):
         now = self._now()
-        if is_hand_raised_now and now - self.last_hand_raised_log_time > HAND_RAISE_COOLDOWN_SECONDS:
+        if is_hand_raised_now and now - self.last_hand_raised_log_time > self._hand_raise_cooldown:
             self.logger(event_type="Hand Motion", description="Hand Raised", timestamp=now)
             self.last_hand_raised_log_time = now
-            self.hand_cooldown_end_time = now + HAND_MOVEMENT_COOLDOWN_SECONDS
+            self.hand_cooldown_end_time = now + self._hand_move_cooldown
             return
         if now < self.hand_cooldown_end_time:
             return
-        self.hand_events_deque.append(now)
-        while self.hand_events_deque and now - self.hand_events_deque[0] > HAND_MOVEMENT_WINDOW_FRAMES / VIDEO_FPS_TARGET:
-            self.hand_events_deque.popleft()
-        if len(self.hand_events_deque) >= (HAND_MOVEMENT_WINDOW_FRAMES / VIDEO_FPS_TARGET) * 1 and            hand_positions_std > HAND_MOVEMENT_STD_THRESHOLD:
+        self.hand_events_times.append(now)
+        cut = bisect_left(self.hand_events_times, now - HAND_WINDOW_SEC)
+        if cut:
+            del self.hand_events_times[:cut]
+        if len(self.hand_events_times) >= HAND_WINDOW_SEC * 1 and            hand_positions_std > self._hand_move_std:
             self.logger(event_type="Hand Motion", description="Hand Detected", timestamp=now)
-            self.hand_cooldown_end_time = now + HAND_MOVEMENT_COOLDOWN_SECONDS
+            self.hand_cooldown_end_time = now + self._hand_move_cooldown
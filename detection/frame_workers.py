@@ -0,0 +1,22 @@
+# Process-pool workers for stateless single-frame analysis.
+#
+# Each worker process holds exactly one warmed VideoProcessor in a module
+# global, created by the pool initializer, so MediaPipe graph init is paid
+# once per worker instead of once per request — and the CPU-bound decode +
+# inference runs outside the server process's GIL.
+
+_worker_processor = None
+
+
+def init_worker():
+    """Create the process-local VideoProcessor (pool initializer)."""
+    global _worker_processor
+    from detection.video_processor import VideoProcessor  # heavy import, worker-local
+    _worker_processor = VideoProcessor()
+
+
+def process_frame(frame_bytes):
+    """Run one frame through the process-local warm processor."""
+    if _worker_processor is None:
+        init_worker()
+    return _worker_processor.process_frame_bytes(frame_bytes)
@@ -1,24 +1,80 @@
+import math
+import time
+
 import cv2
 import numpy as np
 import mediapipe as mp
 from utils.landmark_utils import get_eye_aspect_ratio, get_mouth_aspect_ratio, get_head_pose
 from detection.engagement_logic import EngagementLogic
-from datetime import datetime
+from config import FRAME_SKIP_DIFF_THRESHOLD, FRAME_SKIP_MAX_CONSECUTIVE
 from collections import deque
 
+# Frames already run in parallel across executor threads/pool workers;
+# OpenCV spinning up its own internal thread team per call on top of
+# that just oversubscribes the cores
+cv2.setNumThreads(1)
+
+
+def _format_hms(timestamp):
+    """HH:MM:SS from an epoch timestamp without datetime/strftime overhead."""
+    lt = time.localtime(timestamp)
+    return f"{lt.tm_hour:02d}:{lt.tm_min:02d}:{lt.tm_sec:02d}"
+
+# Optional libjpeg-turbo decoder: SIMD JPEG decode, typically 2-4x faster
+# than OpenCV's bundled libjpeg path. Falls back to cv2.imdecode when
+# PyTurboJPEG (or the native library) isn't available or the payload
+# isn't a JPEG.
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbo_jpeg = TurboJPEG()
+except Exception:
+    _turbo_jpeg = None
+
+_JPEG_MAGIC = b"\xff\xd8"
+
+# Constant landmark index arrays for the vectorized per-frame gather
+_LEFT_EYE_IDX = np.array([362, 385, 387, 263, 373, 380], dtype=np.int32)
+_RIGHT_EYE_IDX = np.array([33, 160, 158, 133, 153, 144], dtype=np.int32)
+_MOUTH_IDX = np.array([61, 81, 13, 311, 402, 14], dtype=np.int32)
+
+
+# Stand-in for a FaceMesh result on frames where the Haar gate decided
+# not to run the graph — downstream only reads .multi_face_landmarks
+class _NoFaceResults:
+    multi_face_landmarks = None
+
+
+_NO_FACE_RESULTS = _NoFaceResults()
+
+
 # A simple in-memory logger callback used by EngagementLogic
 class SimpleLogger:
     def __init__(self):
         self.events = []
     def __call__(self, event_type, description, timestamp):
-        ts_str = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
-        self.events.append((ts_str, event_type, description, ""))
+        # The trailing raw epoch lets persistence use the exact event
+        # time; the HH:MM:SS string is display-only (local time)
+        self.events.append((_format_hms(timestamp), event_type, description, "", timestamp))
 
 # Processor class: maintains MediaPipe instances and an EngagementLogic instance
 class VideoProcessor:
     def __init__(self):
         self.mp_face_mesh = mp.solutions.face_mesh.FaceMesh(refine_landmarks=True, max_num_faces=1)
         self.mp_hands = mp.solutions.hands.Hands(max_num_hands=1)
+        # Cheap Haar pre-detector used to gate FaceMesh while the scene
+        # has no face: a cascade pass on a 160x120 grayscale thumbnail is
+        # an order of magnitude cheaper than the FaceMesh graph
+        try:
+            haar = cv2.CascadeClassifier(
+                cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+            )
+            # builds without the bundled cascade data yield an empty
+            # classifier whose detectMultiScale raises — disable the gate
+            self._haar = None if haar.empty() else haar
+        except Exception:
+            self._haar = None
+        self._last_no_face = False
+        self._no_face_gated = 0
         self.logger = SimpleLogger()
         self.logic = EngagementLogic(self._log_event)
 
@@ -26,22 +82,97 @@ class VideoProcessor:
         self.ear_history = deque(maxlen=10)
         self.mar_history = deque(maxlen=10)
         self.hand_y_positions = deque(maxlen=90)
+        # Rolling sums over hand_y_positions so the movement std is O(1)
+        # per frame instead of an O(N) copy + np.std pass
+        self._hy_s1 = 0.0
+        self._hy_s2 = 0.0
+
+        # Reused output buffer for the per-frame colour convert (a fresh
+        # H×W×3 allocation every frame is pure allocator churn;
+        # shape-checked and regrown if the client changes resolution)
+        self._rgb_buf = None
+
+        # Frame-skip gate state: 16x16 grayscale thumbnail of the last
+        # processed frame plus its result, so near-identical frames can
+        # reuse the previous answer without running MediaPipe
+        self._last_thumb = None
+        self._last_result = None
+        self._skipped_consecutive = 0
+
+    def _should_skip_frame(self, frame_bytes):
+        """
+        Cheap change detector: partial JPEG decode at 1/8 resolution,
+        shrink to 16x16 grayscale, compare mean absolute difference with
+        the previous processed frame. Consecutive video-call frames are
+        near-identical, so most can reuse the last result. A full frame
+        is forced every FRAME_SKIP_MAX_CONSECUTIVE skips so slow drifts
+        (lighting, gradual posture change) can't hide forever.
+        """
+        thumb = cv2.imdecode(
+            np.frombuffer(frame_bytes, np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8
+        )
+        if thumb is None:
+            return False
+        small = cv2.resize(thumb, (16, 16), interpolation=cv2.INTER_AREA)
+        prev, self._last_thumb = self._last_thumb, small
+        if prev is None or self._last_result is None:
+            return False
+        if self._skipped_consecutive >= FRAME_SKIP_MAX_CONSECUTIVE:
+            return False
+        diff = float(np.mean(np.abs(small.astype(np.int16) - prev.astype(np.int16))))
+        return diff < FRAME_SKIP_DIFF_THRESHOLD
 
     def _log_event(self, event_type, description, timestamp):
-        ts_str = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
-        self.logger.events.append((ts_str, event_type, description, ""))
+        # Same shape as SimpleLogger: display string plus raw epoch
+        self.logger.events.append((_format_hms(timestamp), event_type, description, "", timestamp))
 
     def process_frame_bytes(self, frame_bytes):
         # frame_bytes: JPEG/PNG bytes
-        nparr = np.frombuffer(frame_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if frame is None:
-            return {"error": "could not decode frame"}
-        frame = cv2.flip(frame, 1)
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, _ = frame.shape
-
-        face_results = self.mp_face_mesh.process(rgb_frame)
+        if self._should_skip_frame(frame_bytes):
+            self._skipped_consecutive += 1
+            # Same instants as last time; events were already delivered once
+            return dict(self._last_result, events_logged=[])
+        self._skipped_consecutive = 0
+        # Decode straight to RGB on the turbo path — MediaPipe wants RGB,
+        # so asking libjpeg-turbo for it fuses the colour conversion into
+        # the SIMD decode and drops the separate cvtColor pass entirely
+        rgb_frame = None
+        if _turbo_jpeg is not None and frame_bytes[:2] == _JPEG_MAGIC:
+            try:
+                rgb_frame = _turbo_jpeg.decode(frame_bytes, pixel_format=TJPF_RGB)
+            except Exception:
+                rgb_frame = None
+        if rgb_frame is None:
+            nparr = np.frombuffer(frame_bytes, np.uint8)
+            frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            if frame is None:
+                return {"error": "could not decode frame"}
+            if self._rgb_buf is None or self._rgb_buf.shape != frame.shape:
+                self._rgb_buf = np.empty_like(frame)
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+        # No mirror flip: every consumer is mirror-invariant (EAR/MAR are
+        # distances averaged over both eyes, focus checks use abs(yaw),
+        # hand logic reads only wrist height, and no coordinates leave
+        # this method), so the full-frame memcpy bought nothing
+        h, w, _ = rgb_frame.shape
+
+        # While the previous frame had no face, gate the heavyweight
+        # FaceMesh graph behind a Haar cascade pass on a small grayscale
+        # thumbnail; FaceMesh is forced periodically in case the cascade
+        # misses a face the mesh would find
+        run_face_mesh = True
+        if self._haar is not None and self._last_no_face and self._no_face_gated < FRAME_SKIP_MAX_CONSECUTIVE:
+            gray = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY)
+            small = cv2.resize(gray, (160, 120), interpolation=cv2.INTER_AREA)
+            if len(self._haar.detectMultiScale(small, 1.3, 4)) == 0:
+                run_face_mesh = False
+                self._no_face_gated += 1
+        if run_face_mesh:
+            face_results = self.mp_face_mesh.process(rgb_frame)
+            self._last_no_face = not face_results.multi_face_landmarks
+            self._no_face_gated = 0
+        else:
+            face_results = _NO_FACE_RESULTS
         hand_results = self.mp_hands.process(rgb_frame)
 
         response = {
@@ -53,20 +184,21 @@ class VideoProcessor:
 
         if face_results.multi_face_landmarks:
             lm = face_results.multi_face_landmarks[0].landmark
-            coords = lambda idxs: [(int(lm[i].x * w), int(lm[i].y * h)) for i in idxs]
-            left_eye_indices = [362, 385, 387, 263, 373, 380]
-            right_eye_indices = [33, 160, 158, 133, 153, 144]
-            mouth_indices = [61, 81, 13, 311, 402, 14]
-            left_eye_coords = coords(left_eye_indices)
-            right_eye_coords = coords(right_eye_indices)
-            mouth_coords = coords(mouth_indices)
-            ear = (get_eye_aspect_ratio(left_eye_coords) + get_eye_aspect_ratio(right_eye_coords)) / 2
-            mar = get_mouth_aspect_ratio(mouth_coords)
+            # One pass over the protobuf landmarks into an (N,2) pixel-space
+            # array; the regions of interest are then constant-index gathers
+            # instead of per-landmark attribute lookups and int() casts
+            pts = np.fromiter(
+                (v for p in lm for v in (p.x, p.y)),
+                dtype=np.float32, count=2 * len(lm),
+            ).reshape(-1, 2)
+            pts *= (w, h)
+            ear = (get_eye_aspect_ratio(pts[_LEFT_EYE_IDX]) + get_eye_aspect_ratio(pts[_RIGHT_EYE_IDX])) / 2
+            mar = get_mouth_aspect_ratio(pts[_MOUTH_IDX])
             self.ear_history.append(ear)
             self.mar_history.append(mar)
             self.logic.detect_and_register_blink(ear)
             self.logic.detect_and_register_yawn(mar)
-            pitch, yaw, roll = get_head_pose(lm, frame.shape)
+            pitch, yaw, roll = get_head_pose(lm, rgb_frame.shape)
             is_currently_focused = (abs(yaw) <= 25) and (abs(pitch) >= 90)
             response['attention_instant'] = 'Focused' if is_currently_focused else 'Distracted'
             self.logic.update_attention(is_currently_focused, pitch, yaw)
@@ -83,6 +215,7 @@ class VideoProcessor:
             self.ear_history.clear()
             self.mar_history.clear()
             self.hand_y_positions.clear()
+            self._hy_s1 = self._hy_s2 = 0.0
 
         # Hand processing
         is_hand_raised_now = False
@@ -98,9 +231,18 @@ class VideoProcessor:
                 if wrist_y_norm < eye_y_norm * 0.4:
                     is_hand_raised_now = True
                     current_hand_state_instant = 'Hand Raised'
+                if len(self.hand_y_positions) == self.hand_y_positions.maxlen:
+                    old = self.hand_y_positions[0]
+                    self._hy_s1 -= old
+                    self._hy_s2 -= old * old
                 self.hand_y_positions.append(wrist_y_norm)
+                self._hy_s1 += wrist_y_norm
+                self._hy_s2 += wrist_y_norm * wrist_y_norm
                 if len(self.hand_y_positions) == self.hand_y_positions.maxlen:
-                    current_hand_std = float(np.std(list(self.hand_y_positions)))
+                    n = self.hand_y_positions.maxlen
+                    mean = self._hy_s1 / n
+                    # max() guards tiny negative variance from float drift
+                    current_hand_std = math.sqrt(max(0.0, self._hy_s2 / n - mean * mean))
                     if current_hand_std > 0.04:
                         current_hand_state_instant = 'Hand Detected'
         response['hand_instant'] = current_hand_state_instant
@@ -111,7 +253,26 @@ class VideoProcessor:
         response['events_logged'] = list(self.logger.events)
         # Clear logger.events after returning (so API consumer gets only new events next call)
         self.logger.events = []
+        self._last_result = response
         return response
+    def reset(self):
+        """
+        Clear all per-participant state so the processor can be handed to a
+        new participant. The expensive MediaPipe graphs are kept — only the
+        cheap pure-Python logic/state is rebuilt.
+        """
+        self.logger.events = []
+        self.logic = EngagementLogic(self._log_event)
+        self.ear_history.clear()
+        self.mar_history.clear()
+        self.hand_y_positions.clear()
+        self._hy_s1 = self._hy_s2 = 0.0
+        self._last_thumb = None
+        self._last_result = None
+        self._skipped_consecutive = 0
+        self._last_no_face = False
+        self._no_face_gated = 0
+
     def close(self):
         """
         Cleanly close MediaPipe resources. Call this before discarding the processor.
@@ -1,16 +1,48 @@
 # services/db_sqlalchemy.py
 
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Text
+import threading
+
+from sqlalchemy import create_engine, case, event, func, Column, Index, Integer, String, Float, DateTime, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 
 DATABASE_URL = "sqlite:///./engagement.db"
 
+# Pool sized for concurrent writers (WS batches, events, transcripts,
+# summary reads) instead of the 5-connection default; pre-ping and
+# recycle keep pooled connections valid across idle periods and apply
+# unchanged if DATABASE_URL is pointed at a network database.
+# statement_timeout is a Postgres-only option and is omitted — SQLite
+# has no equivalent connect-time setting.
 engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    pool_size=20,
+    max_overflow=40,
+    pool_pre_ping=True,
+    pool_recycle=1800,
 )
 
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """
+        Tune each new SQLite connection: WAL lets readers run during
+        writes and halves the fsyncs per commit (synchronous=NORMAL is
+        safe in WAL — a crash can lose the last transactions but can't
+        corrupt the file), temp tables stay in memory, and a larger page
+        cache plus mmap keeps hot reads off the syscall path.
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=memory")
+        cursor.execute("PRAGMA cache_size=-64000")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.close()
+
+
 Base = declarative_base()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -19,47 +51,297 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Table: Engagement Metrics
 class EngagementMetric(Base):
     __tablename__ = "engagement_metrics"
+    # Composite index matches the dashboard query shape (filter meeting +
+    # participant, order by time) with one range scan; its prefix also
+    # covers meeting_id-only lookups, so no single-column index there.
+    __table_args__ = (
+        Index("ix_em_mid_pid_ts", "meeting_id", "participant_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    meeting_id = Column(String, index=True)
+    meeting_id = Column(String)
     participant_id = Column(String, index=True)
     metric_type = Column(String)
     metric_value = Column(Float)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow,
+                       server_default=func.current_timestamp())
+
+
+# Table: Engagement Events (blinks, yawns, hand raises, attention changes)
+class EngagementEvent(Base):
+    __tablename__ = "engagement_events"
+    __table_args__ = (
+        Index("ix_ee_mid_pid_ts", "meeting_id", "participant_id", "timestamp"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    meeting_id = Column(String)
+    participant_id = Column(String, index=True)
+    event_type = Column(String)
+    description = Column(Text)
+    timestamp = Column(DateTime, default=datetime.utcnow,
+                       server_default=func.current_timestamp())
 
 
 # Table: Audio Transcripts
 class AudioTranscript(Base):
     __tablename__ = "audio_transcripts"
+    __table_args__ = (
+        Index("ix_at_mid_pid_ts", "meeting_id", "participant_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    meeting_id = Column(String, index=True)
+    meeting_id = Column(String)
     participant_id = Column(String, index=True)
     transcript_text = Column(Text)
     start_time = Column(Float)  # optional, in seconds
     end_time = Column(Float)    # optional, in seconds
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(DateTime, default=datetime.utcnow,
+                       server_default=func.current_timestamp())
 
 
 Base.metadata.create_all(bind=engine)
 
+# create_all only creates missing tables — databases that predate the
+# composite indexes keep their old schema. Create the model-declared
+# indexes on pre-existing tables idempotently, and drop the superseded
+# single-column meeting_id indexes the old models used to declare.
+with engine.begin() as _conn:
+    for _table in Base.metadata.tables.values():
+        for _index in _table.indexes:
+            _index.create(bind=_conn, checkfirst=True)
+        _conn.exec_driver_sql(
+            f"DROP INDEX IF EXISTS ix_{_table.name}_meeting_id"
+        )
+
+# Refresh the query planner's index statistics now that the schema
+# (including the composite indexes above) is in place
+if DATABASE_URL.startswith("sqlite"):
+    with engine.connect() as _conn:
+        _conn.exec_driver_sql("PRAGMA optimize")
+
+
+# Instant states carried in every processed frame payload
+INSTANT_METRICS = ("attention_instant", "fatigue_instant", "hand_instant")
+
+
+# Instant-state string -> metric value. One hash lookup per metric
+# instead of two tuple membership scans; this runs three times per
+# frame per participant. Unknown states map to 0.0 via .get default.
+_METRIC_MAP = {
+    "focused": 1.0,
+    "normal": 1.0,
+    "hand raised": 1.0,
+    "hand detected": 1.0,
+    "distracted": 0.0,
+    "potential fatigue": 0.0,
+    "fatigue detected": 0.0,
+}
+
+
+def convert_metric(value):
+    """
+    Map an instant-state value (e.g. 'Focused', 'Distracted') onto a float
+    suitable for EngagementMetric.metric_value.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return 0.0
+    return _METRIC_MAP.get(value.lower(), 0.0)
+
+
+# Long-lived session shared by every writer in this module. Opening a
+# session per call means a connection checkout and transaction setup per
+# row; instead all save_* paths reuse one cached session (autoflush/
+# expire disabled — it only ever inserts) under a lock, and the session
+# is dropped after any error so the next write reconnects cleanly.
+_writer_session = None
+_writer_lock = threading.Lock()
+
+
+def _get_writer_session():
+    global _writer_session
+    if _writer_session is None:
+        _writer_session = SessionLocal(autoflush=False, expire_on_commit=False)
+    return _writer_session
+
+
+def _reset_writer_session():
+    """Drop the cached writer session after an error so the next batch reconnects."""
+    global _writer_session
+    if _writer_session is not None:
+        try:
+            _writer_session.close()
+        except Exception:
+            pass
+        _writer_session = None
+
+
+# Column order for positional metric row tuples (cheaper to build and
+# buffer than one dict per row; expanded to dicts only at execute time)
+_METRIC_COLS = ("meeting_id", "participant_id", "metric_type", "metric_value", "timestamp")
+
+
+# Save a batch of buffered frame payloads in one transaction
+def save_engagement_frames_bulk(frames: list):
+    """
+    frames: list of per-frame payload dicts as produced by the WS loop
+    (meeting_id, participant_id, timestamp, *_instant, events_logged).
+
+    Rows are built as plain tuples and expanded with dict(zip(...)) only
+    for the single Core multi-row INSERT — no per-row ORM objects, no
+    identity map growth, one commit for the whole batch.
+    """
+    if not frames:
+        return
+    metric_rows = []
+    event_rows = []
+    for f in frames:
+        ts = datetime.utcfromtimestamp(f["timestamp"]) if f.get("timestamp") else datetime.utcnow()
+        mid, pid = f["meeting_id"], f["participant_id"]
+        for name in INSTANT_METRICS:
+            metric_rows.append((mid, pid, name, convert_metric(f.get(name)), ts))
+        events = f.get("events_logged")
+        if events:
+            event_rows.extend(_event_rows(mid, pid, events))
+    with _writer_lock:
+        db = _get_writer_session()
+        try:
+            db.execute(
+                EngagementMetric.__table__.insert(),
+                [dict(zip(_METRIC_COLS, r)) for r in metric_rows],
+            )
+            if event_rows:
+                db.execute(EngagementEvent.__table__.insert(), event_rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            _reset_writer_session()
+            raise e
+
+
+def _event_rows(meeting_id: str, participant_id: str, events: list):
+    """Expand (ts_str, event_type, description, ...) tuples into insert rows."""
+    rows = []
+    now = datetime.utcnow()
+    for ev in events:
+        ts_str, event_type, description = ev[0], ev[1], ev[2]
+        # Events carry their raw epoch time as the trailing element (see
+        # detection.video_processor's loggers); use it directly — the
+        # HH:MM:SS string is local-time and display-only, so grafting it
+        # onto a UTC date would skew stored times by the zone offset.
+        epoch = ev[4] if len(ev) > 4 else None
+        if epoch:
+            ts = datetime.utcfromtimestamp(epoch)
+        else:
+            # Legacy payloads without the epoch: fixed-format HH:MM:SS,
+            # so split/int beats strptime's pure-Python machinery
+            try:
+                h, m, s = ts_str.split(":")
+                ts = datetime(now.year, now.month, now.day, int(h), int(m), int(s))
+            except (ValueError, AttributeError):
+                ts = now
+        rows.append({
+            "meeting_id": meeting_id,
+            "participant_id": participant_id,
+            "event_type": event_type,
+            "description": description,
+            "timestamp": ts,
+        })
+    return rows
+
+
+# Save engagement events (blink/yawn/hand/attention log entries)
+def save_engagement_events_sqlalchemy(meeting_id: str, participant_id: str, events: list):
+    rows = _event_rows(meeting_id, participant_id, events)
+    if not rows:
+        return
+    with _writer_lock:
+        db = _get_writer_session()
+        try:
+            db.execute(EngagementEvent.__table__.insert(), rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            _reset_writer_session()
+            raise e
+
 
 # Save engagement metrics
 def save_engagement_sqlalchemy(meeting_id: str, participant_id: str, metrics: dict):
+    # timestamp is omitted on purpose: the column default fills it in
+    # (client-side utcnow on schemas that predate the DDL default, the
+    # server default on fresh ones). The bulk frame writer still binds
+    # timestamps explicitly because there they carry the frame capture
+    # time.
+    rows = [
+        {
+            "meeting_id": meeting_id,
+            "participant_id": participant_id,
+            "metric_type": metric_name,
+            "metric_value": float(value),
+        }
+        for metric_name, value in metrics.items()
+    ]
+    if not rows:
+        return
+    with _writer_lock:
+        db = _get_writer_session()
+        try:
+            db.execute(EngagementMetric.__table__.insert(), rows)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            _reset_writer_session()
+            raise e
+
+
+# Aggregate per-meeting engagement stats in SQL (single scan per table,
+# no Python-side iteration over stored rows)
+def get_meeting_summary_stats(meeting_id: str):
+    """
+    Returns (stats, transcripts) for a meeting:
+    stats is a dict of aggregate counts computed DB-side with
+    count/sum(case(...)); transcripts is a list of
+    (participant_id, transcript_text) tuples in participant order.
+    """
     db = SessionLocal()
     try:
-        for metric_name, value in metrics.items():
-            record = EngagementMetric(
-                meeting_id=meeting_id,
-                participant_id=participant_id,
-                metric_type=metric_name,
-                metric_value=float(value)
-            )
-            db.add(record)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise e
+        attention_frames, focused_frames = db.query(
+            func.count(EngagementMetric.id),
+            func.coalesce(
+                func.sum(case((EngagementMetric.metric_value >= 1.0, 1), else_=0)), 0
+            ),
+        ).filter(
+            EngagementMetric.meeting_id == meeting_id,
+            EngagementMetric.metric_type == "attention_instant",
+        ).one()
+
+        fatigue_events, hand_raises = db.query(
+            func.coalesce(
+                func.sum(case((EngagementEvent.event_type == "Fatigue", 1), else_=0)), 0
+            ),
+            func.coalesce(
+                func.sum(case((EngagementEvent.description == "Hand Raised", 1), else_=0)), 0
+            ),
+        ).filter(EngagementEvent.meeting_id == meeting_id).one()
+
+        transcripts = db.query(
+            AudioTranscript.participant_id, AudioTranscript.transcript_text
+        ).filter(
+            AudioTranscript.meeting_id == meeting_id
+        ).order_by(
+            AudioTranscript.participant_id, AudioTranscript.timestamp
+        ).all()
+
+        stats = {
+            "attention_frames": int(attention_frames),
+            "focused_frames": int(focused_frames),
+            "fatigue_events": int(fatigue_events),
+            "hand_raises": int(hand_raises),
+        }
+        return stats, [(pid, text) for pid, text in transcripts]
     finally:
         db.close()
 
@@ -67,20 +349,20 @@ def save_engagement_sqlalchemy(meeting_id: str, participant_id: str, metrics: di
 # Save audio transcript
 def save_transcript_sqlalchemy(meeting_id: str, participant_id: str, transcript_text: str,
                                start_time: float = None, end_time: float = None):
-    db = SessionLocal()
-    try:
-        record = AudioTranscript(
-            meeting_id=meeting_id,
-            participant_id=participant_id,
-            transcript_text=transcript_text,
-            start_time=start_time,
-            end_time=end_time
-        )
-        db.add(record)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        raise e
-    finally:
-        db.close()
+    with _writer_lock:
+        db = _get_writer_session()
+        try:
+            record = AudioTranscript(
+                meeting_id=meeting_id,
+                participant_id=participant_id,
+                transcript_text=transcript_text,
+                start_time=start_time,
+                end_time=end_time
+            )
+            db.add(record)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            _reset_writer_session()
+            raise e
 
@@ -1,11 +1,28 @@
 import csv
 import os
+from itertools import groupby
+from operator import itemgetter
+
 from fpdf import FPDF
 from config import OUTPUT_DIR
 
+# Lines per multi_cell call when rendering long transcripts/logs.
+# multi_cell re-measures text per invocation, so batching entries into
+# pre-joined chunks cuts the Python dispatch count by this factor.
+_PDF_CHUNK_LINES = 200
+
+
+def _write_chunked(pdf, entries, line_height=12):
+    """Emit entries in pre-joined chunks instead of one multi_cell each."""
+    for i in range(0, len(entries), _PDF_CHUNK_LINES):
+        pdf.multi_cell(0, line_height, "\n".join(entries[i:i + _PDF_CHUNK_LINES]))
+
 def save_csv(filename, rows, headers):
+    # rows may be any iterable (generator included) — writerows consumes
+    # it directly, so large exports never need a materialized list. The
+    # 1 MB buffer amortizes write syscalls across many small rows.
     os.makedirs(os.path.dirname(filename), exist_ok=True)
-    with open(filename, 'w', newline='', encoding='utf-8') as f:
+    with open(filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
         writer = csv.writer(f)
         writer.writerow(headers)
         writer.writerows(rows)
@@ -17,10 +34,47 @@ def generate_pdf_transcript(transcriptions, out_path=None):
     pdf.add_page()
     pdf.set_font("helvetica", size=12)
     pdf.multi_cell(0, 10, "Lecture Transcriptions\n\n")
-    for ts, text in transcriptions:
-        pdf.multi_cell(0, 12, f"[{ts}] {text or '(No speech detected)'}")
-        pdf.ln(5)
-    pdf.output(out_path)
+    entries = [f"[{ts}] {text or '(No speech detected)'}\n"
+               for ts, text in transcriptions]
+    _write_chunked(pdf, entries)
+    # Render in memory, write once — one syscall instead of fpdf's
+    # internal buffered writes to an open file handle
+    with open(out_path, "wb") as f:
+        f.write(bytes(pdf.output()))
+
+def generate_pdf_meeting_summary(meeting_id, stats, transcripts):
+    """
+    Render a per-meeting summary PDF from pre-aggregated stats
+    (see services.db_sqlalchemy.get_meeting_summary_stats) and the
+    meeting's transcripts. Returns the PDF as bytes — no disk
+    round-trip; the caller decides whether to persist or stream it.
+    """
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("helvetica", size=12)
+    pdf.multi_cell(0, 10, f"Meeting Summary: {meeting_id}\n\n")
+
+    attention_frames = stats.get("attention_frames", 0)
+    focused_frames = stats.get("focused_frames", 0)
+    focused_pct = (100.0 * focused_frames / attention_frames) if attention_frames else 0.0
+    pdf.multi_cell(0, 10, "\n".join([
+        f"Frames analyzed: {attention_frames}",
+        f"Focused frames: {focused_frames} ({focused_pct:.1f}%)",
+        f"Fatigue events: {stats.get('fatigue_events', 0)}",
+        f"Hand raises: {stats.get('hand_raises', 0)}",
+    ]))
+    pdf.ln(5)
+
+    if transcripts:
+        pdf.multi_cell(0, 10, "Transcripts\n")
+        # transcripts arrive ordered by participant: pre-join each
+        # participant's chunks and emit one multi_cell per participant
+        for pid, chunks in groupby(transcripts, key=itemgetter(0)):
+            text = "\n".join(t or "(No speech detected)" for _, t in chunks)
+            pdf.multi_cell(0, 12, f"{pid}:\n{text}")
+            pdf.ln(5)
+    return bytes(pdf.output())
+
 
 def generate_pdf_logs(events, out_path=None):
     if out_path is None:
@@ -29,10 +83,13 @@ def generate_pdf_logs(events, out_path=None):
     pdf.add_page()
     pdf.set_font("helvetica", size=12)
     pdf.multi_cell(0, 10, "Engagement Log Summary\n\n")
-    for ts, etype, desc, speech in events:
+    entries = []
+    # *_ tolerates the trailing raw epoch the event loggers now append
+    for ts, etype, desc, speech, *_ in events:
         log_entry = f"[{ts}] {etype}: {desc}"
         if speech:
             log_entry += f"\n    Speech Context: \"{speech}\""
-        pdf.multi_cell(0, 12, log_entry)
-        pdf.ln(5)
-    pdf.output(out_path)
+        entries.append(log_entry + "\n")
+    _write_chunked(pdf, entries)
+    with open(out_path, "wb") as f:
+        f.write(bytes(pdf.output()))
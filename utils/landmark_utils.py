@@ -3,48 +3,82 @@ import numpy as np
 import cv2
 
 def euclidean_distance(p1, p2):
-    return math.sqrt((p1[0]-p2[0])**2 + (p1[1]-p2[1])**2)
+    return math.hypot(p1[0] - p2[0], p1[1] - p2[1])
+
+
+def _aspect_ratio(landmarks):
+    """
+    (A + B) / 2C over the standard 6-point eye/mouth layout. The six
+    points arrive as a (6, 2) ndarray from the frame loop; one tolist()
+    unpacks them to Python floats in a single C call, which beats both
+    per-element ndarray indexing (np.float32 scalar boxing) and an
+    np.linalg.norm over 3 rows (fancy-indexing overhead dominates at
+    this size) by several times.
+    """
+    if isinstance(landmarks, np.ndarray):
+        landmarks = landmarks.tolist()
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3), (x4, y4), (x5, y5) = landmarks
+    A = math.hypot(x1 - x5, y1 - y5)
+    B = math.hypot(x2 - x4, y2 - y4)
+    C = math.hypot(x0 - x3, y0 - y3)
+    return (A + B) / (2.0 * C) if C else 0.0
+
 
 def get_eye_aspect_ratio(eye_landmarks):
-    A = euclidean_distance(eye_landmarks[1], eye_landmarks[5])
-    B = euclidean_distance(eye_landmarks[2], eye_landmarks[4])
-    C = euclidean_distance(eye_landmarks[0], eye_landmarks[3])
-    return (A+B) / (2.0*C) if C != 0 else 0
+    return _aspect_ratio(eye_landmarks)
 
 def get_mouth_aspect_ratio(mouth_landmarks):
-    A = euclidean_distance(mouth_landmarks[1], mouth_landmarks[5])
-    B = euclidean_distance(mouth_landmarks[2], mouth_landmarks[4])
-    C = euclidean_distance(mouth_landmarks[0], mouth_landmarks[3])
-    return (A+B) / (2.0*C) if C != 0 else 0
+    return _aspect_ratio(mouth_landmarks)
+
+# Generic 3D face model for head pose: nose tip, chin, eye corners,
+# mouth corners. Constant, so built once instead of per call.
+_HEAD_MODEL_POINTS = np.array([
+    (0.0, 0.0, 0.0),
+    (0.0, -330.0, -65.0),
+    (-225.0, 170.0, -135.0),
+    (225.0, 170.0, -135.0),
+    (-150.0, -150.0, -125.0),
+    (150.0, -150.0, -125.0)
+], dtype=np.float64)
+
+# FaceMesh landmark indices matching _HEAD_MODEL_POINTS row for row
+_HEAD_POSE_IDX = (1, 152, 33, 263, 61, 291)
+
+# Camera intrinsics depend only on the frame size; clients send a fixed
+# resolution, so cache per (h, w)
+_CAMERA_MATRICES = {}
+
+
+def _get_camera_matrix(img_h, img_w):
+    cam = _CAMERA_MATRICES.get((img_h, img_w))
+    if cam is None:
+        focal_length = img_w
+        cam = np.array([
+            [focal_length, 0, img_w / 2],
+            [0, focal_length, img_h / 2],
+            [0, 0, 1]
+        ], dtype=np.float64)
+        _CAMERA_MATRICES[(img_h, img_w)] = cam
+    return cam
+
 
 def get_head_pose(face_landmarks, image_shape):
-    img_h, img_w, _ = image_shape
-    image_points = np.array([
-        (face_landmarks[1].x * img_w, face_landmarks[1].y * img_h),
-        (face_landmarks[152].x * img_w, face_landmarks[152].y * img_h),
-        (face_landmarks[33].x * img_w, face_landmarks[33].y * img_h),
-        (face_landmarks[263].x * img_w, face_landmarks[263].y * img_h),
-        (face_landmarks[61].x * img_w, face_landmarks[61].y * img_h),
-        (face_landmarks[291].x * img_w, face_landmarks[291].y * img_h)
-    ], dtype="double")
-    model_points = np.array([
-        (0.0, 0.0, 0.0),
-        (0.0, -330.0, -65.0),
-        (-225.0, 170.0, -135.0),
-        (225.0, 170.0, -135.0),
-        (-150.0, -150.0, -125.0),
-        (150.0, -150.0, -125.0)
-    ])
-    focal_length = img_w
-    center = (img_w / 2, img_h / 2)
-    camera_matrix = np.array([
-        [focal_length, 0, center[0]],
-        [0, focal_length, center[1]],
-        [0, 0, 1]
-    ], dtype="double")
-    dist_coeffs = np.zeros((4, 1))
+    img_h, img_w = image_shape[0], image_shape[1]
+    # Fill a fresh (6, 2) buffer by direct assignment — no nested-tuple
+    # intermediate for np.array to walk. (A module-level buffer would be
+    # marginally cheaper but races across the frame-executor threads.)
+    image_points = np.empty((6, 2), dtype=np.float64)
+    for row, idx in enumerate(_HEAD_POSE_IDX):
+        lm = face_landmarks[idx]
+        image_points[row, 0] = lm.x * img_w
+        image_points[row, 1] = lm.y * img_h
+    # EPnP is a direct closed-form solve — no iterative refinement loop.
+    # (IPPE would be cheaper still but requires coplanar model points,
+    # which this 3D face model is not.) No distortion model: passing
+    # None skips the undistort step entirely.
     success, rotation_vector, translation_vector = cv2.solvePnP(
-        model_points, image_points, camera_matrix, dist_coeffs, flags=cv2.SOLVEPNP_ITERATIVE)
+        _HEAD_MODEL_POINTS, image_points, _get_camera_matrix(img_h, img_w),
+        None, flags=cv2.SOLVEPNP_EPNP)
     rmat, _ = cv2.Rodrigues(rotation_vector)
     angles, *_ = cv2.RQDecomp3x3(rmat)
     return angles[0], angles[1], angles[2]